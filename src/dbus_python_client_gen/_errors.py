@@ -23,3 +23,26 @@ class DPClientRuntimeError(Exception):
     Exception raised during execution of generated classes.
     """
     pass
+
+class DPClientKeyMismatchError(DPClientRuntimeError):
+    """
+    Exception raised when a generated method is invoked with keyword
+    arguments that do not match the arguments of the method.
+    """
+
+    def __init__(self, expected, got):
+        """
+        Initializer.
+
+        :param expected: the names of the method's arguments
+        :type expected: tuple of str
+        :param got: the names of the keyword arguments actually passed
+        :type got: tuple of str
+        """
+        super().__init__(expected, got)
+        self.expected = expected
+        self.got = got
+
+    def __str__(self):
+        return "Key mismatch: %s != %s" % \
+           (", ".join(self.expected), ", ".join(self.got))
@@ -5,51 +5,66 @@
 """
 Code for generating classes suitable for invoking dbus-python methods.
 """
+import functools
+import keyword
+import operator
+import sys
 import types
+import unicodedata
 import dbus
 
 from into_dbus_python import xformers
 
 from ._errors import DPClientGenerationError
-from ._errors import DPClientRuntimeError
+from ._errors import DPClientKeyMismatchError
 
+# Signatures recur frequently across properties, methods and interfaces;
+# parse each distinct signature only once.
+_xformers_cached = functools.lru_cache(maxsize=None)(xformers)
 
-def prop_builder(spec):
+
+def _single_xformer(signature):
     """
-    Returns a function that builds a property interface based on 'spec'.
+    Get the transformer for a signature consisting of one complete type.
 
-    Usage example:
+    xformers() yields a (function, signature) pair for each complete type;
+    each function returns a (value, variant level) pair, so callers must
+    take the first element of its result.
 
-    * spec is an xml specification for an interface in the format returned
-    by the Introspect() method.
-    * proxy_object is a dbus-python ProxyObject which implements
-    the interface defined by spec which has a Name property.
+    :param str signature: the signature of a single complete type
+    :returns: the transformer
+    """
+    return _xformers_cached(signature)[0][0]
 
-    >>> builder = prop_builder(spec)
-    >>> Properties = types.new_class("Properties", bases=(object,), exec_body=builder)
-    >>> Properties.Name.Get(proxy_object)
-    >>> Properties.Name.Set(proxy_object, "name")
+# Default for the parameters of generated methods, marking an argument
+# that was not passed.
+_MISSING = object()
 
-    Note that both Get and Set are optional and depend on the properties of the
-    attribute.
+_METHOD_TEMPLATE = """\
+def dbus_func(_proxy_object, %(params)s**_kwargs):
+    if _kwargs%(missing)s:
+        raise _mismatch([%(values)s], _kwargs)
+    return _get_method(_proxy_object)(%(args)sdbus_interface=_iface)
+"""
 
-    :param spec: the interface specification
-    :type spec: xml.element.ElementTree.Element
 
-    :raises DPClientGenerationError:
+def _prop_builder(interface_name, props):
     """
+    Returns a function that builds a property interface from 'props'.
 
-    try:
-        interface_name = spec.attrib['name']
-    except KeyError as err: # pragma: no cover
-        raise DPClientGenerationError("No name found for interface.") from err
+    :param str interface_name: the name of the interface
+    :param props: the property specifications of the interface
+    :type props: list of xml.element.ElementTree.Element
+
+    :raises DPClientGenerationError:
+    """
 
     def builder(namespace):
         """
         Fills the namespace of the parent class with class members that are
-        classes. Each class member has the name of a property, and each
-        class has up to two static methods, a Get method if the property is
-        readable and a Set method if the property is writable.
+        simple namespaces. Each class member has the name of a property, and
+        each namespace has up to two functions, a Get function if the
+        property is readable and a Set function if the property is writable.
 
         For example, given the spec:
 
@@ -59,149 +74,188 @@ def prop_builder(spec):
                 value="const"/>
         </property>
 
-        A class called "Version" with a single method "Get" will be added to the
-        namespace.
+        A namespace called "Version" with a single function "Get" will be
+        added to the namespace.
 
         :param namespace: the class's namespace
         """
 
-        def build_property_getter(spec):
+        def build_property_getter(name):
             """
             Build a single property getter for this class.
 
-            :param spec: the specification for this property
+            :param str name: the name of the property
             """
 
-            try:
-                name = spec.attrib['name']
-            except KeyError as err: # pragma: no cover
-                raise DPClientGenerationError("No name found for property.") \
-                   from err
-
-            def dbus_func(proxy_object): # pragma: no cover
+            def dbus_func(
+               proxy_object,
+               *,
+               _iface=interface_name,
+               _name=name,
+               _piface=dbus.PROPERTIES_IFACE
+            ):
                 """
                 The property getter.
+
+                The keyword-only arguments are bound at generation time so
+                that they are local variables; they are not to be passed.
                 """
-                return proxy_object.Get(
-                   interface_name,
-                   name,
-                   dbus_interface=dbus.PROPERTIES_IFACE
-                )
+                return proxy_object.Get(_iface, _name, dbus_interface=_piface)
 
             return dbus_func
 
-        def build_property_setter(spec):
+        def build_property_setter(name, signature):
             """
             Build a single property setter for this class.
 
-            :param spec: the specification for a single property
+            :param str name: the name of the property
+            :param str signature: the signature of the property
             """
-            try:
-                name = spec.attrib['name']
-            except KeyError as err: # pragma: no cover
-                raise DPClientGenerationError("No name found for property.") \
-                   from err
-
-            try:
-                signature = spec.attrib['type']
-            except KeyError as err: # pragma: no cover
-                raise DPClientGenerationError("No type found for property.") \
-                   from err
-            xformer = xformers(signature)[0]
-
-            def dbus_func(proxy_object, value): # pragma: no cover
+            xformer = _single_xformer(signature)
+
+            def dbus_func(
+               proxy_object,
+               value,
+               *,
+               _iface=interface_name,
+               _name=name,
+               _xformer=xformer,
+               _piface=dbus.PROPERTIES_IFACE
+            ):
                 """
                 The property setter.
+
+                The keyword-only arguments are bound at generation time so
+                that they are local variables; they are not to be passed.
                 """
                 return proxy_object.Set(
-                   interface_name,
-                   name,
-                   xformer(value),
-                   dbus_interface=dbus.PROPERTIES_IFACE
+                   _iface,
+                   _name,
+                   _xformer(value)[0],
+                   dbus_interface=_piface
                 )
 
             return dbus_func
 
-        for prop in spec.findall('./property'):
+        for prop in props:
             try:
-                access = prop.attrib['access']
+                name = sys.intern(prop.attrib['name'])
             except KeyError as err: # pragma: no cover
-                raise DPClientGenerationError("No access found for property.") \
+                raise DPClientGenerationError("No name found for property.") \
                    from err
 
-            if access == "read":
-                getter = build_property_getter(prop)
-
-                def prop_method_builder(namespace):
-                    """
-                    Attaches appropriate methods to namespace.
-                    """
-                    # pylint: disable=cell-var-from-loop
-                    namespace['Get'] = staticmethod(getter)
-
-            elif access == "write":
-                setter = build_property_setter(prop)
-
-                def prop_method_builder(namespace):
-                    """
-                    Attaches appropriate methods to namespace.
-                    """
-                    # pylint: disable=cell-var-from-loop
-                    namespace['Set'] = staticmethod(setter)
-            else:
-                getter = build_property_getter(prop)
-                setter = build_property_setter(prop)
-
-                def prop_method_builder(namespace):
-                    """
-                    Attaches appropriate methods to namespace.
-                    """
-                    # pylint: disable=cell-var-from-loop
-                    namespace['Get'] = staticmethod(getter)
-                    namespace['Set'] = staticmethod(setter)
-
             try:
-                name = prop.attrib['name']
+                access = prop.attrib['access']
             except KeyError as err: # pragma: no cover
-                raise DPClientGenerationError("No name found for property.") \
+                raise DPClientGenerationError("No access found for property.") \
                    from err
 
-            namespace[name] = \
-               types.new_class(
-                  name,
-                  bases=(object,),
-                  exec_body=prop_method_builder
-               )
+            members = dict()
+
+            if access != "write":
+                members['Get'] = build_property_getter(name)
+
+            if access != "read":
+                try:
+                    signature = prop.attrib['type']
+                except KeyError as err: # pragma: no cover
+                    raise DPClientGenerationError(
+                       "No type found for property."
+                    ) from err
+                members['Set'] = build_property_setter(name, signature)
+
+            namespace[name] = types.SimpleNamespace(**members)
 
     return builder
 
 
-def method_builder(spec):
+def _can_generate(arg_names):
     """
-    Returns a function that builds a method interface based on 'spec'.
+    Whether a method taking these arguments can be generated from source.
+
+    Each argument name becomes a keyword-only parameter of the generated
+    function, so it must be an identifier that is not a keyword. The
+    compiler NFKC-normalizes identifiers while keyword arguments at a call
+    are not normalized, so a name must also be in NFKC form to be matched.
+    Names that begin with an underscore are reserved for the generated
+    function's own use.
+
+    :param arg_names: the names of the method's arguments
+    :type arg_names: tuple of str
+    :rtype: bool
+    """
+    return all(
+       n.isidentifier() and \
+       not keyword.iskeyword(n) and \
+       unicodedata.normalize("NFKC", n) == n and \
+       not n.startswith("_")
+       for n in arg_names
+    )
 
-    Usage example:
 
-    * spec is an xml specification for an interface in the format returned
-    by the Introspect() method.
-    * proxy_object is a dbus-python ProxyObject which implements
-    the interface defined by spec which has a Name property.
+def _generate_method(name, interface_name, arg_names, arg_xformers):
+    """
+    Generate a method by compiling source specialized for its arguments.
+
+    The generated function takes each argument as a keyword-only parameter,
+    so that no dict of keyword arguments is built or searched on a call.
+    A missing or unexpected keyword is still reported with a
+    DPClientKeyMismatchError.
+
+    :param str name: the name of the method
+    :param str interface_name: the name of the interface
+    :param arg_names: the names of the method's arguments, in order
+    :type arg_names: tuple of str
+    :param arg_xformers: the transformer for each argument, in order
+    :returns: the method
+    """
 
-    >>> builder = method_builder(spec)
-    >>> Methods = types.new_class("Methods", bases=(object,), exec_body=builder)
-    >>> Methods.Method(proxy_object)
+    def mismatch(values, kwargs):
+        """
+        The error to raise if the keyword arguments do not match.
 
-    :param spec: the interface specification
-    :type spec: xml.element.ElementTree.Element
+        :param values: the values of the method's arguments, in order
+        :param kwargs: any unexpected keyword arguments
+        """
+        keys = [k for (k, v) in zip(arg_names, values) if v is not _MISSING]
+        keys.extend(kwargs.keys())
+        return DPClientKeyMismatchError(arg_names, tuple(keys))
+
+    params = "".join("%s=_MISSING, " % n for n in arg_names)
+    source = _METHOD_TEMPLATE % {
+       "params": "*, %s" % params if arg_names else "",
+       "missing": "".join(" or %s is _MISSING" % n for n in arg_names),
+       "values": ", ".join(arg_names),
+       "args": "".join("_x%d(%s)[0], " % (i, n) for (i, n) in enumerate(arg_names))
+    }
+
+    namespace = {
+       "__name__": __name__,
+       "_MISSING": _MISSING,
+       "_get_method": operator.attrgetter(name),
+       "_iface": interface_name,
+       "_mismatch": mismatch
+    }
+    namespace.update(("_x%d" % i, x) for (i, x) in enumerate(arg_xformers))
+    exec(source, namespace) # pylint: disable=exec-used
+
+    dbus_func = namespace["dbus_func"]
+    dbus_func.__name__ = dbus_func.__qualname__ = name
+    dbus_func.__doc__ = "The method proper."
+    return dbus_func
+
+
+def _method_builder(interface_name, methods):
+    """
+    Returns a function that builds a method interface from 'methods'.
+
+    :param str interface_name: the name of the interface
+    :param methods: the method specifications of the interface
+    :type methods: list of xml.element.ElementTree.Element
 
     :raises DPClientGenerationError:
     """
 
-    try:
-        interface_name = spec.attrib['name']
-    except KeyError as err: # pragma: no cover
-        raise DPClientGenerationError("No name found for interface.") from err
-
     def builder(namespace):
         """
         Fills the namespace of the parent class with class members that are
@@ -227,54 +281,139 @@ def method_builder(spec):
         :param namespace: the class's namespace
         """
 
-        def build_method(spec):
+        def build_method(name, spec):
             """
             Build a method for this class.
 
+            :param str name: the name of the method
             :param spec: the specification for a single method
             :type spec: Element
             """
 
-            try:
-                name = spec.attrib["name"]
-            except KeyError as err: # pragma: no cover
-                raise DPClientGenerationError("No name found for method.") \
-                   from err
+            inargs = [
+               e for e in spec \
+               if e.tag == "arg" and e.attrib.get("direction") == "in"
+            ]
+            arg_names = tuple(sys.intern(e.attrib["name"]) for e in inargs)
+            if len(frozenset(arg_names)) != len(arg_names):
+                raise DPClientGenerationError(
+                   "Duplicate argument names for method %s." % name
+                )
 
-            inargs = spec.findall('./arg[@direction="in"]')
-            arg_names = [e.attrib["name"] for e in inargs]
+            arg_xformers = \
+               tuple(_single_xformer(e.attrib["type"]) for e in inargs)
+
+            if _can_generate(arg_names):
+                return _generate_method(
+                   name,
+                   interface_name,
+                   arg_names,
+                   arg_xformers
+                )
 
-            signature = "".join(e.attrib["type"] for e in inargs)
-            func = xformers(signature)
+            get_method = operator.attrgetter(name)
+            expected_keys = frozenset(arg_names)
+            arg_pairs = tuple(zip(arg_names, arg_xformers))
 
-            def dbus_func(proxy_object, **kwargs): # pragma: no cover
+            def dbus_func(_proxy_object, **kwargs):
                 """
                 The method proper.
                 """
-                if frozenset(arg_names) != frozenset(kwargs.keys()):
-                    raise DPClientRuntimeError("Key mismatch: %s != %s" %
-                       (", ".join(arg_names), ", ".join(kwargs.keys())))
-                args = \
-                   [v for (k, v) in \
-                   sorted(kwargs.items(), key=lambda x: arg_names.index(x[0]))]
-                xformed_args = func(args)
-                dbus_method = getattr(proxy_object, name)
+                if kwargs.keys() != expected_keys:
+                    raise DPClientKeyMismatchError(arg_names, tuple(kwargs))
+                xformed_args = [x(kwargs[k])[0] for (k, x) in arg_pairs]
+                dbus_method = get_method(_proxy_object)
                 return dbus_method(*xformed_args, dbus_interface=interface_name)
 
+            dbus_func.__name__ = dbus_func.__qualname__ = name
             return dbus_func
 
-        for method in spec.findall('./method'):
+        for method in methods:
             try:
-                name = method.attrib['name']
+                name = sys.intern(method.attrib['name'])
             except KeyError as err: # pragma: no cover
                 raise DPClientGenerationError("No name found for method.") \
                    from err
 
-            namespace[name] = staticmethod(build_method(method))
+            namespace[name] = build_method(name, method)
 
     return builder
 
 
+def _interface_name(spec):
+    """
+    Get the name of the interface.
+
+    :param spec: the interface specification
+    :type spec: xml.element.ElementTree.Element
+    :rtype: str
+
+    :raises DPClientGenerationError:
+    """
+    try:
+        return sys.intern(spec.attrib['name'])
+    except KeyError as err: # pragma: no cover
+        raise DPClientGenerationError("No name found for interface.") from err
+
+
+def prop_builder(spec):
+    """
+    Returns a function that builds a property interface based on 'spec'.
+
+    Usage example:
+
+    * spec is an xml specification for an interface in the format returned
+    by the Introspect() method.
+    * proxy_object is a dbus-python ProxyObject which implements
+    the interface defined by spec which has a Name property.
+
+    >>> builder = prop_builder(spec)
+    >>> Properties = types.new_class("Properties", bases=(object,), exec_body=builder)
+    >>> Properties.Name.Get(proxy_object)
+    >>> Properties.Name.Set(proxy_object, "name")
+
+    Note that both Get and Set are optional and depend on the properties of the
+    attribute.
+
+    :param spec: the interface specification
+    :type spec: xml.element.ElementTree.Element
+
+    :raises DPClientGenerationError:
+    """
+
+    return _prop_builder(
+       _interface_name(spec),
+       [c for c in spec if c.tag == "property"]
+    )
+
+
+def method_builder(spec):
+    """
+    Returns a function that builds a method interface based on 'spec'.
+
+    Usage example:
+
+    * spec is an xml specification for an interface in the format returned
+    by the Introspect() method.
+    * proxy_object is a dbus-python ProxyObject which implements
+    the interface defined by spec which has a Name property.
+
+    >>> builder = method_builder(spec)
+    >>> Methods = types.new_class("Methods", bases=(object,), exec_body=builder)
+    >>> Methods.Method(proxy_object)
+
+    :param spec: the interface specification
+    :type spec: xml.element.ElementTree.Element
+
+    :raises DPClientGenerationError:
+    """
+
+    return _method_builder(
+       _interface_name(spec),
+       [c for c in spec if c.tag == "method"]
+    )
+
+
 def dbus_python_invoker_builder(spec):
     """
     Returns a function that builds a method interface based on 'spec'.
@@ -285,29 +424,33 @@ def dbus_python_invoker_builder(spec):
     :raises DPClientGenerationError:
     """
 
+    interface_name = _interface_name(spec)
+
+    # Walk the interface once, sharing the result between both builders.
+    prop_specs = []
+    method_specs = []
+    for child in spec:
+        if child.tag == "property":
+            prop_specs.append(child)
+        elif child.tag == "method":
+            method_specs.append(child)
+
     def builder(namespace):
         """
         Fills the namespace of the parent class with two class members,
-        Properties and Methods. Both of these are classes which themselves
-        contain static fields. Each static field in the Properties class
-        is a class corresponding to a property of the interface. Each static
-        field in the Methods class is a method corresponding to a method
-        on the interface.
+        Properties and Methods. Both of these are simple namespaces. Each
+        member of Properties is itself a simple namespace corresponding to
+        a property of the interface. Each member of Methods is a function
+        corresponding to a method on the interface.
 
         :param namespace: the class's namespace
         """
-        namespace["Methods"] = \
-           types.new_class(
-              "Methods",
-              bases=(object,),
-              exec_body=method_builder(spec)
-           )
-
-        namespace["Properties"] = \
-           types.new_class(
-              "Properties",
-              bases=(object,),
-              exec_body=prop_builder(spec)
-           )
+        methods = dict()
+        _method_builder(interface_name, method_specs)(methods)
+        namespace["Methods"] = types.SimpleNamespace(**methods)
+
+        properties = dict()
+        _prop_builder(interface_name, prop_specs)(properties)
+        namespace["Properties"] = types.SimpleNamespace(**properties)
 
     return builder
@@ -0,0 +1,30 @@
+"""
+Test behavior of exceptions raised by generated classes.
+"""
+
+import unittest
+
+from dbus_python_client_gen._errors import DPClientKeyMismatchError
+from dbus_python_client_gen._errors import DPClientRuntimeError
+
+
+class KeyMismatchTestCase(unittest.TestCase):
+    """
+    Test the key mismatch exception.
+    """
+
+    def testAttributes(self):
+        """
+        The exception records the expected and the passed keys.
+        """
+        err = DPClientKeyMismatchError(("name", "force"), ("name",))
+        self.assertIsInstance(err, DPClientRuntimeError)
+        self.assertEqual(err.expected, ("name", "force"))
+        self.assertEqual(err.got, ("name",))
+
+    def testStr(self):
+        """
+        The string representation lists both sets of keys.
+        """
+        err = DPClientKeyMismatchError(("name", "force"), ("name",))
+        self.assertEqual(str(err), "Key mismatch: name, force != name")
@@ -2,18 +2,64 @@
 Test generation of class for invoking dbus methods.
 """
 
+import inspect
 import os
 import types
 import unittest
 
 import xml.etree.ElementTree as ET
 
+import dbus
+
 from dbus_python_client_gen import dbus_python_invoker_builder
 
+from dbus_python_client_gen._errors import DPClientGenerationError
+from dbus_python_client_gen._errors import DPClientKeyMismatchError
+
 from dbus_python_client_gen._invokers import method_builder
 from dbus_python_client_gen._invokers import prop_builder
 
 
+_DATADIR = os.path.join(os.path.dirname(__file__), "data")
+
+
+class _ProxyObject(object):
+    """
+    Stands in for a dbus-python ProxyObject, recording the calls made on it.
+    """
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        def dbus_method(*args, **kwargs):
+            """
+            Record the call.
+            """
+            self.calls.append((name, args, kwargs))
+        return dbus_method
+
+
+def _read_spec(name):
+    """
+    Read an interface spec from the data directory.
+
+    :param str name: the name of the file
+    """
+    return ET.parse(os.path.join(_DATADIR, name)).getroot()
+
+
+def _build_klass(spec):
+    """
+    Build a class from an interface spec.
+
+    :param spec: the interface specification
+    :type spec: Element
+    """
+    builder = dbus_python_invoker_builder(spec)
+    return types.new_class("Klass", bases=(object,), exec_body=builder)
+
 
 class TestCase(unittest.TestCase):
     """
@@ -110,3 +156,337 @@ class TestCase(unittest.TestCase):
         self._testProperties()
         self._testMethods()
         self._testKlass()
+
+
+class InvocationTestCase(unittest.TestCase):
+    """
+    Test invoking generated methods and properties on a proxy object.
+    """
+
+    def setUp(self):
+        """
+        Read the Manager interface.
+        """
+        self._klass = _build_klass(_read_spec("org.storage.stratis1.Manager.xml"))
+
+    def testShape(self):
+        """
+        Methods and Properties are simple namespaces; each method is a plain
+        function and each property is itself a simple namespace.
+        """
+        self.assertIsInstance(self._klass.Methods, types.SimpleNamespace)
+        self.assertIsInstance(self._klass.Properties, types.SimpleNamespace)
+        self.assertEqual(
+           sorted(vars(self._klass.Methods)),
+           ["ConfigureSimulator", "CreatePool", "DestroyPool"]
+        )
+        self.assertEqual(
+           sorted(vars(self._klass.Properties)),
+           ["ErrorValues", "RedundancyValues", "Version"]
+        )
+        self.assertIsInstance(
+           self._klass.Methods.CreatePool,
+           types.FunctionType
+        )
+
+    def testXformers(self):
+        """
+        Each argument is transformed to the dbus-python type required by its
+        signature and passed to the D-Bus method in order.
+        """
+        proxy = _ProxyObject()
+        self._klass.Methods.CreatePool(
+           proxy,
+           name="pool",
+           redundancy=(True, 1),
+           force=False,
+           devices=["/dev/a"]
+        )
+
+        self.assertEqual(len(proxy.calls), 1)
+        (name, args, kwargs) = proxy.calls[0]
+        self.assertEqual(name, "CreatePool")
+        self.assertEqual(
+           kwargs,
+           {"dbus_interface": "org.storage.stratis1.Manager"}
+        )
+        self.assertEqual(args, ("pool", (True, 1), False, ["/dev/a"]))
+
+        self.assertIsInstance(args[0], dbus.String)
+        self.assertIsInstance(args[1], dbus.Struct)
+        self.assertIsInstance(args[1][0], dbus.Boolean)
+        self.assertIsInstance(args[1][1], dbus.UInt16)
+        self.assertIsInstance(args[2], dbus.Boolean)
+        self.assertIsInstance(args[3], dbus.Array)
+        self.assertEqual(args[3].signature, "s")
+
+    def testCall(self):
+        """
+        The arguments are passed to the D-Bus method in the order of the
+        spec, along with the interface.
+        """
+        proxy = _ProxyObject()
+        self._klass.Methods.CreatePool(
+           proxy,
+           devices=["/dev/a"],
+           force=False,
+           redundancy=(True, 1),
+           name="pool"
+        )
+        self.assertEqual(
+           proxy.calls,
+           [(
+              "CreatePool",
+              ("pool", (True, 1), False, ["/dev/a"]),
+              {"dbus_interface": "org.storage.stratis1.Manager"}
+           )]
+        )
+
+    def testGenerated(self):
+        """
+        A method whose arguments are plain identifiers is generated with
+        keyword-only parameters and is described by its D-Bus name.
+        """
+        method = self._klass.Methods.CreatePool
+        parameters = inspect.signature(method).parameters
+        self.assertEqual(
+           [n for (n, p) in parameters.items() if p.kind == p.KEYWORD_ONLY],
+           ["name", "redundancy", "force", "devices"]
+        )
+        self.assertEqual(method.__name__, "CreatePool")
+        self.assertEqual(method.__qualname__, "CreatePool")
+        self.assertEqual(method.__module__, "dbus_python_client_gen._invokers")
+        self.assertIsNotNone(method.__doc__)
+
+    def testMissingKey(self):
+        """
+        Omitting an argument raises a key mismatch error.
+        """
+        proxy = _ProxyObject()
+        with self.assertRaises(DPClientKeyMismatchError) as context:
+            self._klass.Methods.CreatePool(
+               proxy,
+               name="pool",
+               redundancy=(True, 1),
+               force=False
+            )
+        self.assertEqual(
+           context.exception.expected,
+           ("name", "redundancy", "force", "devices")
+        )
+        self.assertEqual(context.exception.got, ("name", "redundancy", "force"))
+        self.assertEqual(proxy.calls, [])
+
+    def testExtraKey(self):
+        """
+        Passing an unknown argument raises a key mismatch error.
+        """
+        proxy = _ProxyObject()
+        with self.assertRaises(DPClientKeyMismatchError) as context:
+            self._klass.Methods.DestroyPool(proxy, pool="/a", force=True)
+        self.assertEqual(context.exception.expected, ("pool",))
+        self.assertEqual(context.exception.got, ("pool", "force"))
+        self.assertEqual(proxy.calls, [])
+
+    def testNoArguments(self):
+        """
+        A method without arguments passes only the interface.
+        """
+        klass = _build_klass(
+           _read_spec("org.freedesktop.DBus.Introspectable.xml")
+        )
+        proxy = _ProxyObject()
+        klass.Methods.Introspect(proxy)
+        self.assertEqual(
+           proxy.calls,
+           [(
+              "Introspect",
+              (),
+              {"dbus_interface": "org.freedesktop.DBus.Introspectable"}
+           )]
+        )
+
+        with self.assertRaises(DPClientKeyMismatchError):
+            klass.Methods.Introspect(proxy, force=True)
+
+
+class PropertyTestCase(unittest.TestCase):
+    """
+    Test invoking generated property getters and setters.
+    """
+
+    _IFACE = "org.storage.stratis1.Manager"
+
+    def setUp(self):
+        """
+        Read the interface with read, readwrite and write properties.
+        """
+        self._klass = _build_klass(_read_spec("fake.storage.stratis1.Manager.xml"))
+
+    def testShape(self):
+        """
+        Each property is a simple namespace with a Get function only if it
+        is readable and a Set function only if it is writable.
+        """
+        properties = self._klass.Properties
+        for name in ("ErrorValues", "RedundancyValues", "Version"):
+            self.assertIsInstance(
+               getattr(properties, name),
+               types.SimpleNamespace
+            )
+
+        self.assertTrue(hasattr(properties.ErrorValues, "Get"))
+        self.assertFalse(hasattr(properties.ErrorValues, "Set"))
+        self.assertTrue(hasattr(properties.RedundancyValues, "Get"))
+        self.assertTrue(hasattr(properties.RedundancyValues, "Set"))
+        self.assertFalse(hasattr(properties.Version, "Get"))
+        self.assertTrue(hasattr(properties.Version, "Set"))
+
+    def testGet(self):
+        """
+        Get calls the proxy's Get with the interface and property name.
+        """
+        proxy = _ProxyObject()
+        self._klass.Properties.ErrorValues.Get(proxy)
+        self.assertEqual(
+           proxy.calls,
+           [(
+              "Get",
+              (self._IFACE, "ErrorValues"),
+              {"dbus_interface": dbus.PROPERTIES_IFACE}
+           )]
+        )
+
+    def testSet(self):
+        """
+        Set calls the proxy's Set with the interface, property name and
+        transformed value.
+        """
+        proxy = _ProxyObject()
+        self._klass.Properties.Version.Set(proxy, "1.0")
+        self._klass.Properties.RedundancyValues.Set(proxy, [("raid", 1)])
+        self.assertEqual(
+           proxy.calls,
+           [
+              (
+                 "Set",
+                 (self._IFACE, "Version", "1.0"),
+                 {"dbus_interface": dbus.PROPERTIES_IFACE}
+              ),
+              (
+                 "Set",
+                 (self._IFACE, "RedundancyValues", [("raid", 1)]),
+                 {"dbus_interface": dbus.PROPERTIES_IFACE}
+              )
+           ]
+        )
+        self.assertIsInstance(proxy.calls[0][1][2], dbus.String)
+        self.assertIsInstance(proxy.calls[1][1][2], dbus.Array)
+        self.assertEqual(proxy.calls[1][1][2].signature, "(sq)")
+
+
+class FallbackTestCase(unittest.TestCase):
+    """
+    Test methods whose argument names can not all be Python parameters.
+    """
+
+    def setUp(self):
+        """
+        Read the interface with awkward argument names.
+        """
+        self._klass = _build_klass(_read_spec("fake.client.gen.Arguments.xml"))
+
+    def testReserved(self):
+        """
+        Keywords and names with a leading underscore are accepted as keyword
+        arguments and passed in order.
+        """
+        method = self._klass.Methods.Reserved
+        self.assertIn("kwargs", inspect.signature(method).parameters)
+        self.assertEqual(method.__name__, "Reserved")
+
+        proxy = _ProxyObject()
+        method(proxy, **{"_flag": True, "class": "c"})
+        self.assertEqual(len(proxy.calls), 1)
+        (name, args, kwargs) = proxy.calls[0]
+        self.assertEqual(name, "Reserved")
+        self.assertEqual(args, ("c", True))
+        self.assertIsInstance(args[1], dbus.Boolean)
+        self.assertEqual(kwargs, {"dbus_interface": "fake.client.gen.Arguments"})
+
+    def testMismatch(self):
+        """
+        Missing and unknown arguments raise a key mismatch error.
+        """
+        proxy = _ProxyObject()
+        with self.assertRaises(DPClientKeyMismatchError) as context:
+            self._klass.Methods.Reserved(proxy, **{"class": "c"})
+        self.assertEqual(context.exception.expected, ("class", "_flag"))
+        self.assertEqual(context.exception.got, ("class",))
+
+        with self.assertRaises(DPClientKeyMismatchError) as context:
+            self._klass.Methods.Reserved(
+               proxy,
+               **{"class": "c", "_flag": True, "force": True}
+            )
+        self.assertEqual(context.exception.got, ("class", "_flag", "force"))
+        self.assertEqual(proxy.calls, [])
+
+    def testProxyObject(self):
+        """
+        An argument may be named proxy_object, whether the method is
+        generated from source or not.
+        """
+        proxy = _ProxyObject()
+        self._klass.Methods.Proxy(proxy, proxy_object="p")
+        self._klass.Methods.ProxyReserved(proxy, proxy_object="p", _flag=True)
+        self.assertEqual(
+           proxy.calls,
+           [
+              (
+                 "Proxy",
+                 ("p",),
+                 {"dbus_interface": "fake.client.gen.Arguments"}
+              ),
+              (
+                 "ProxyReserved",
+                 ("p", True),
+                 {"dbus_interface": "fake.client.gen.Arguments"}
+              )
+           ]
+        )
+
+    def testDuplicate(self):
+        """
+        A method with two arguments of the same name is rejected when the
+        class is generated.
+        """
+        spec = ET.fromstring(
+           '<interface name="fake.client.gen.Duplicate">'
+           '<method name="Twice">'
+           '<arg name="value" type="s" direction="in"/>'
+           '<arg name="value" type="u" direction="in"/>'
+           '</method>'
+           '</interface>'
+        )
+        with self.assertRaises(DPClientGenerationError):
+            _build_klass(spec)
+
+    def testNotNormalized(self):
+        """
+        A name that is changed by NFKC normalization can still be passed.
+        """
+        spec = ET.fromstring(
+           '<interface name="fake.client.gen.Ligature">'
+           '<method name="Open">'
+           '<arg name="\ufb01le" type="s" direction="in"/>'
+           '</method>'
+           '</interface>'
+        )
+        klass = _build_klass(spec)
+        proxy = _ProxyObject()
+        klass.Methods.Open(proxy, **{"\ufb01le": "f"})
+        self.assertEqual(
+           proxy.calls,
+           [("Open", ("f",), {"dbus_interface": "fake.client.gen.Ligature"})]
+        )